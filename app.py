@@ -1,9 +1,13 @@
 import os
-from flask import Flask, jsonify, request, send_from_directory
+import csv
+import io
+import json
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
 from bybit_client import BybitClient
+import profiling
 import time
 from threading import Lock
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 app = Flask(__name__, static_folder='frontend/dist', static_url_path='')
 
@@ -15,6 +19,14 @@ cache = {
 cache_lock = Lock()
 CACHE_DURATION = 1  # seconds
 
+# Last rendered payload and its JSON bytes, keyed by render_key()
+render_cache = {
+    'key': None,
+    'data': None,
+    'body': None
+}
+render_lock = Lock()
+
 # Global chart data storage
 chart_history = []
 chart_lock = Lock()
@@ -77,6 +89,118 @@ def get_chart_data():
             'y': point['value']
         } for point in chart_history]
 
+# History export
+EXPORT_CHUNK_SIZE = 500  # rows read from storage per query
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_FIELDS = {
+    'snapshots': ['timestamp', 'equity', 'hour_key', 'source'],
+    'chart': ['timestamp', 'value'],
+}
+
+def parse_export_time(value):
+    """Parse an ISO 8601 or epoch-seconds query parameter into a UTC datetime"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    try:
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"{value} is out of range") from e
+
+def iter_chart_points(start=None, end=None, after=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield chart points oldest first, copying at most chunk_size points per lock"""
+    # Compare as exported (microsecond datetimes) so a cursor taken from a row matches that row
+    lower = after or start
+    inclusive = after is None
+
+    while True:
+        with chart_lock:
+            chunk = []
+            for point in chart_history:
+                timestamp = datetime.fromtimestamp(point['timestamp'], tz=timezone.utc)
+                if lower is not None and (timestamp < lower or (timestamp == lower and not inclusive)):
+                    continue
+                if end is not None and timestamp >= end:
+                    break
+                chunk.append({'timestamp': timestamp, 'value': point['value']})
+                if len(chunk) >= chunk_size:
+                    break
+
+        yield from chunk
+
+        if len(chunk) < chunk_size:
+            return
+        lower, inclusive = chunk[-1]['timestamp'], False
+
+def export_rows(rows, fields, fmt, header=True):
+    """Serialize rows one at a time as NDJSON lines or CSV records"""
+    def values(row):
+        return [row[f].isoformat() if isinstance(row[f], datetime) else row[f] for f in fields]
+
+    if fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(fields, values(row)))) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    for row in rows:
+        writer.writerow(values(row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def build_export(args):
+    """
+    Validate export query params and return (source, fmt, body generator).
+    Raises ValueError for an unsupported source/format or unparseable time.
+    """
+    source = args.get('source', 'snapshots')
+    fmt = (args.get('format') or 'ndjson').lower()
+    if source not in EXPORT_FIELDS or fmt not in EXPORT_FORMATS:
+        raise ValueError('Unsupported source or format')
+
+    try:
+        start = parse_export_time(args.get('start'))
+        end = parse_export_time(args.get('end'))
+        cursor = parse_export_time(args.get('cursor'))
+    except (ValueError, OverflowError, OSError) as e:
+        raise ValueError(f"Invalid time: {e}")
+
+    if source == 'snapshots':
+        client = get_bybit_client()
+        rows = client.iter_snapshots(start, end, cursor, EXPORT_CHUNK_SIZE) if client else iter(())
+    else:
+        rows = iter_chart_points(start, end, cursor, EXPORT_CHUNK_SIZE)
+
+    return source, fmt, export_rows(rows, EXPORT_FIELDS[source], fmt, header=cursor is None)
+
+@app.route('/api/export')
+def api_export():
+    """
+    Stream equity snapshots or chart points for a time range.
+    Query params: source (snapshots|chart), format (ndjson|csv), start, end
+    (ISO 8601 or epoch seconds) and cursor - the timestamp of the last row
+    received, to resume an interrupted export without repeating rows.
+    """
+    try:
+        source, fmt, body = build_export(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    return Response(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f"attachment; filename={source}.{fmt}",
+        'Cache-Control': 'no-store',
+    })
+
 @app.route('/collect-equity')
 def collect_equity():
     """Endpoint for hourly equity collection (called by Cloud Scheduler)"""
@@ -130,13 +254,15 @@ def classify_change(value):
     return 'neutral', NEUTRAL_COLOR
 
 
+@profiling.traced('format_change_line')
 def format_change_line(pnl_value, pnl_pct, window_label, source='true', hours=None):
     """
     Generate a descriptive line for performance text.
     pnl_value: USD difference
     pnl_pct: percentage difference
     window_label: description such as 'last hour'
-    source: 'true', 'approx', 'fallback', 'missing'
+    source: 'true', 'estimate', 'approx', 'fallback', 'missing'
+            ('estimate' = baseline snapshot reconstructed by backfill_equity.py)
     hours: number of hours between snapshots (for fallback messaging)
     """
     line = {'text': '', 'class': 'neutral', 'color': NEUTRAL_COLOR}
@@ -152,6 +278,8 @@ def format_change_line(pnl_value, pnl_pct, window_label, source='true', hours=No
     if abs(cookies_delta) < 0.01:
         if source == 'approx':
             line['text'] = f"No meaningful change in the {window_label} yet (approximate)."
+        elif source == 'estimate':
+            line['text'] = f"No meaningful change in the {window_label} (estimated)."
         else:
             line['text'] = f"No meaningful change in the {window_label}."
         line['class'], line['color'] = 'neutral', NEUTRAL_COLOR
@@ -162,6 +290,8 @@ def format_change_line(pnl_value, pnl_pct, window_label, source='true', hours=No
 
     if source == 'true':
         line['text'] = f"{cookies_text} in the {window_label} {pct_text}".strip()
+    if source == 'estimate':
+        line['text'] = f"{cookies_text} in the {window_label} {pct_text} (estimated).".strip()
     if source == 'fallback':
         if hours:
             line['text'] = f"{cookies_text} since {hours:.1f} hours ago {pct_text} (closest snapshot available).".strip()
@@ -177,6 +307,124 @@ def format_change_line(pnl_value, pnl_pct, window_label, source='true', hours=No
     return line
 
 
+def _rounded(value, digits=0):
+    return None if value is None else round(value, digits)
+
+
+def render_key(account_info, unrealized_pnl):
+    """
+    Inputs of render_cookie_data rounded to what the dashboard can show
+    (cookies to 3 decimals = whole dollars, percentages to 2 decimals).
+    Equal keys render the same visible payload.
+    """
+    key = [
+        _rounded(account_info['equity']),
+        _rounded(unrealized_pnl),
+        _rounded(account_info.get('maintenance_margin', 0)),
+        _rounded(account_info.get('effective_leverage'), 2),
+        last_chart_update,  # changes whenever a chart point is added
+    ]
+    for window in ('1h', '24h', '72h'):
+        key += [
+            _rounded(account_info.get(f'pnl_{window}')),
+            _rounded(account_info.get(f'pnl_{window}_percentage'), 2),
+            account_info.get(f'pnl_{window}_source'),
+            _rounded(account_info.get(f'pnl_{window}_hours'), 1),
+        ]
+    return tuple(key)
+
+
+def render_cookie_data(account_info, unrealized_pnl):
+    """Build the dashboard payload from account info"""
+    equity = account_info['equity']
+    pnl_24h = account_info.get('pnl_24h')
+    pnl_24h_percentage = account_info.get('pnl_24h_percentage')
+
+    # Get maintenance margin data
+    maintenance_margin = account_info.get('maintenance_margin', 0)
+
+    # Calculate maintenance margin used percentage
+    # This shows how much of your equity is being used for maintenance margin
+    mm_used_percentage = (maintenance_margin / equity * 100) if equity > 0 else 0
+    pnl_24h_source = account_info.get('pnl_24h_source', 'approx')
+    pnl_24h_hours = account_info.get('pnl_24h_hours')
+
+    pnl_1h = account_info.get('pnl_1h')
+    pnl_1h_percentage = account_info.get('pnl_1h_percentage')
+    pnl_1h_source = account_info.get('pnl_1h_source', 'missing')
+    pnl_1h_hours = account_info.get('pnl_1h_hours')
+
+    pnl_72h = account_info.get('pnl_72h')
+    pnl_72h_percentage = account_info.get('pnl_72h_percentage')
+    pnl_72h_source = account_info.get('pnl_72h_source', 'approx')
+    pnl_72h_hours = account_info.get('pnl_72h_hours')
+
+    effective_leverage = account_info.get('effective_leverage')
+    leverage_display = None
+    leverage_class = 'leverage-neutral'
+    if effective_leverage is not None:
+        leverage_display = f"{effective_leverage:.2f}x"
+        if effective_leverage > 3:
+            leverage_class = 'leverage-high'
+        else:
+            leverage_class = 'leverage-low'
+
+    cookie_count = equity / 1000  # Keep as float for decimal display
+
+    # Build descriptive lines
+    lines = []
+    one_hour_line = format_change_line(
+        pnl_1h, pnl_1h_percentage, 'last hour', pnl_1h_source, pnl_1h_hours)
+    lines.append(one_hour_line)
+    day_line = format_change_line(
+        pnl_24h, pnl_24h_percentage, 'last 24 hours', pnl_24h_source, pnl_24h_hours)
+    lines.append(day_line)
+    # Add 3-day (72h) line
+    three_day_line = format_change_line(
+        pnl_72h, pnl_72h_percentage, 'last 3 days', pnl_72h_source, pnl_72h_hours)
+    lines.append(three_day_line)
+
+    pnl_text = ' '.join(line['text'] for line in lines)
+
+    cookie_grid = list(range(int(cookie_count)))  # Grid shows whole cookies only
+
+    # Determine primary color/class using first non-neutral line; fallback to first line
+    primary_line = next((line for line in lines if line['class'] != 'neutral'), lines[0])
+    pnl_color = primary_line['color']
+    pnl_class = primary_line['class']
+
+    headline_pct = pnl_24h_percentage if pnl_24h_source != 'missing' else pnl_1h_percentage
+
+    unrealized_pnl_cookies = unrealized_pnl / 1000  # Convert to cookies
+
+    return {
+        'cookie_count': cookie_count,
+        'equity': equity,
+        'unrealized_pnl': unrealized_pnl,
+        'unrealized_pnl_cookies': unrealized_pnl_cookies,
+        'pnl_percentage': headline_pct,
+        'pnl_text': pnl_text,
+        'pnl_lines': lines,
+        'pnl_color': pnl_color,
+        'pnl_class': pnl_class,
+        'cookie_grid': cookie_grid,
+        'chart_data': get_chart_data(),
+        'effective_leverage': effective_leverage,
+        'leverage_display': leverage_display,
+        'leverage_class': leverage_class,
+        'maintenance_margin_percentage': mm_used_percentage
+    }
+
+
+def rendered_body(data):
+    """JSON bytes for `data`, reusing the pre-serialized render when it matches"""
+    with render_lock:
+        if render_cache['data'] is data:
+            return render_cache['body']
+    return app.json.dumps(data).encode('utf-8')
+
+
+@profiling.profiled('get_cookie_data')
 def get_cookie_data(use_cache=True):
     """Get cookie data with optional caching to prevent duplicate API calls"""
     global cache
@@ -186,7 +434,7 @@ def get_cookie_data(use_cache=True):
         with cache_lock:
             if cache['data'] is not None and cache['timestamp'] is not None:
                 age = time.time() - cache['timestamp']
-                if age < CACHE_DURATION:
+                if age < CACHE_DURATION and profiling.use_cached():
                     return cache['data']
     
     try:
@@ -214,103 +462,24 @@ def get_cookie_data(use_cache=True):
                 'maintenance_margin_percentage': 0
             }
         
-        equity = account_info['equity']
-        pnl_24h = account_info.get('pnl_24h')
-        pnl_24h_percentage = account_info.get('pnl_24h_percentage')
-        
-        # Get maintenance margin data
-        maintenance_margin = account_info.get('maintenance_margin', 0)
-        maintenance_margin_rate = account_info.get('maintenance_margin_rate', 0)
-        available_balance = account_info.get('available_balance', 0)
-        
-        # Calculate maintenance margin used percentage
-        # This shows how much of your equity is being used for maintenance margin
-        mm_used_percentage = (maintenance_margin / equity * 100) if equity > 0 else 0
-        pnl_24h_source = account_info.get('pnl_24h_source', 'approx')
-        pnl_24h_hours = account_info.get('pnl_24h_hours')
-
-        pnl_1h = account_info.get('pnl_1h')
-        pnl_1h_percentage = account_info.get('pnl_1h_percentage')
-        pnl_1h_source = account_info.get('pnl_1h_source', 'missing')
-        pnl_1h_hours = account_info.get('pnl_1h_hours')
-        
-        pnl_72h = account_info.get('pnl_72h')
-        pnl_72h_percentage = account_info.get('pnl_72h_percentage')
-        pnl_72h_source = account_info.get('pnl_72h_source', 'approx')
-        pnl_72h_hours = account_info.get('pnl_72h_hours')
-
-        effective_leverage = account_info.get('effective_leverage')
-        leverage_display = None
-        leverage_class = 'leverage-neutral'
-        if effective_leverage is not None:
-            leverage_display = f"{effective_leverage:.2f}x"
-            if effective_leverage > 3:
-                leverage_class = 'leverage-high'
-            else:
-                leverage_class = 'leverage-low'
-        
-        cookie_count = equity / 1000  # Keep as float for decimal display
-        
+        cookie_count = account_info['equity'] / 1000  # Keep as float for decimal display
+
         # Update chart history
         update_chart_history(cookie_count)
-        
-        # Determine primary window (prefer 72h, then 24h, then 1h)
-        if pnl_72h_source == 'true':
-            primary_pnl = pnl_72h
-        elif pnl_24h_source != 'missing':
-            primary_pnl = pnl_24h
-        else:
-            primary_pnl = pnl_1h
-
-        pnl_color = '#4CAF50' if primary_pnl and primary_pnl > 0 else '#F44336' if primary_pnl and primary_pnl < 0 else '#9E9E9E'
-        pnl_class = 'gain' if primary_pnl and primary_pnl > 0 else 'loss' if primary_pnl and primary_pnl < 0 else 'neutral'
-
-        # Build descriptive lines
-        lines = []
-        one_hour_line = format_change_line(
-            pnl_1h, pnl_1h_percentage, 'last hour', pnl_1h_source, pnl_1h_hours)
-        lines.append(one_hour_line)
-        day_line = format_change_line(
-            pnl_24h, pnl_24h_percentage, 'last 24 hours', pnl_24h_source, pnl_24h_hours)
-        lines.append(day_line)
-        # Add 3-day (72h) line
-        three_day_line = format_change_line(
-            pnl_72h, pnl_72h_percentage, 'last 3 days', pnl_72h_source, pnl_72h_hours)
-        lines.append(three_day_line)
-
-        pnl_text = ' '.join(line['text'] for line in lines)
-        
-        cookie_grid = list(range(int(cookie_count)))  # Grid shows whole cookies only
-
-        # Determine primary color/class using first non-neutral line; fallback to first line
-        primary_line = next((line for line in lines if line['class'] != 'neutral'), lines[0])
-        pnl_color = primary_line['color']
-        pnl_class = primary_line['class']
-        
-        headline_pct = pnl_24h_percentage if pnl_24h_source != 'missing' else pnl_1h_percentage
 
         # Get unrealized PnL for display
         unrealized_pnl = client.get_current_unrealized_pnl() or 0
-        unrealized_pnl_cookies = unrealized_pnl / 1000  # Convert to cookies
-
-        result = {
-            'cookie_count': cookie_count,
-            'equity': equity,
-            'unrealized_pnl': unrealized_pnl,
-            'unrealized_pnl_cookies': unrealized_pnl_cookies,
-            'pnl_percentage': headline_pct,
-            'pnl_text': pnl_text,
-            'pnl_lines': lines,
-            'pnl_color': pnl_color,
-            'pnl_class': pnl_class,
-            'cookie_grid': cookie_grid,
-            'chart_data': get_chart_data(),
-            'effective_leverage': effective_leverage,
-            'leverage_display': leverage_display,
-            'leverage_class': leverage_class,
-            'maintenance_margin_percentage': mm_used_percentage
-        }
-        
+
+        # Reuse the previous render when nothing visible changed
+        key = render_key(account_info, unrealized_pnl)
+        with render_lock:
+            result = render_cache['data'] if render_cache['key'] == key else None
+        if result is None:
+            result = render_cookie_data(account_info, unrealized_pnl)
+            body = app.json.dumps(result).encode('utf-8')
+            with render_lock:
+                render_cache.update(key=key, data=result, body=body)
+
         # Cache the result
         with cache_lock:
             cache['data'] = result
@@ -346,10 +515,13 @@ def get_cookie_data(use_cache=True):
         return error_result
 
 @app.route('/api/data')
+@profiling.profiled('api_data')
 def api_data():
     """API endpoint for fetching updated data without page reload"""
     data = get_cookie_data()
-    return jsonify(data)
+    with profiling.span('json_encode'):
+        body = rendered_body(data)
+    return app.response_class(body, mimetype=app.json.mimetype)
 
 @app.route('/api/health')
 def health_check():
@@ -0,0 +1,150 @@
+"""
+Async (ASGI) serving mode for Bybit Cookie Counter
+Serves the same routes as app.py without tying up a worker per connection:
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+
+pybit and Datastore are blocking clients, so refreshes run in a worker thread
+while the event loop keeps accepting connections. Only one refresh is in
+flight at a time; while it runs, requests get the last cached payload.
+Requests carrying the X-Profile token (see profiling.py) run their own
+profiled refresh instead.
+"""
+
+import asyncio
+import os
+import time
+from itertools import islice
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+import app as wsgi_app
+import profiling
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DIST_DIR = os.path.join(ROOT, 'frontend', 'dist')
+STATIC_DIR = os.path.join(ROOT, 'static')
+
+_refresh_task = None
+
+
+def _profiled_refresh():
+    with profiling.forced():
+        return wsgi_app.get_cookie_data(use_cache=False)
+
+
+async def get_cookie_data(request):
+    """Cached data if fresh; otherwise start (or join) a single background refresh and serve stale data meanwhile"""
+    global _refresh_task
+
+    if profiling.requested(request.headers):
+        return await asyncio.to_thread(_profiled_refresh)
+
+    with wsgi_app.cache_lock:
+        data, timestamp = wsgi_app.cache['data'], wsgi_app.cache['timestamp']
+
+    if data is not None and time.time() - timestamp < wsgi_app.CACHE_DURATION:
+        return data
+
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(asyncio.to_thread(wsgi_app.get_cookie_data, False))
+
+    if data is not None:
+        return data
+    # Nothing cached yet (cold start): wait for the first refresh
+    return await asyncio.shield(_refresh_task)
+
+
+async def api_data(request):
+    """API endpoint for fetching updated data without page reload"""
+    data = await get_cookie_data(request)
+    return Response(wsgi_app.rendered_body(data), media_type='application/json')
+
+
+async def siri_summary(request):
+    """Lightweight endpoint for Siri Shortcuts, returns just the cookie number"""
+    data = await get_cookie_data(request)
+    cookie_count = data.get('cookie_count', 0) if data else 0
+
+    if 'json' in (request.query_params.get('format') or '').lower():
+        return JSONResponse({'cookie_count': round(cookie_count, 2)})
+
+    return PlainTextResponse(f"{cookie_count:.2f}")
+
+
+async def collect_equity(request):
+    """Endpoint for hourly equity collection (called by Cloud Scheduler)"""
+    try:
+        from collect_equity import collect_equity_snapshot
+
+        success = await run_in_threadpool(collect_equity_snapshot)
+
+        if success:
+            return JSONResponse({'status': 'success', 'message': 'Equity snapshot collected'})
+        return JSONResponse({'status': 'error', 'message': 'Failed to collect equity'}, status_code=500)
+
+    except Exception as e:
+        return JSONResponse({'status': 'error', 'message': str(e)}, status_code=500)
+
+
+def export_blocks(body):
+    """Join EXPORT_CHUNK_SIZE rows per block so the event loop does one thread hop per block, not per row"""
+    while True:
+        block = ''.join(islice(body, wsgi_app.EXPORT_CHUNK_SIZE))
+        if not block:
+            return
+        yield block
+
+
+async def api_export(request):
+    """Stream equity snapshots or chart points (see app.api_export for parameters)"""
+    try:
+        source, fmt, body = wsgi_app.build_export(request.query_params)
+    except ValueError as e:
+        return JSONResponse({'status': 'error', 'message': str(e)}, status_code=400)
+
+    return StreamingResponse(iterate_in_threadpool(export_blocks(body)), media_type=wsgi_app.EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f"attachment; filename={source}.{fmt}",
+        'Cache-Control': 'no-store',
+    })
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    return JSONResponse({'status': 'ok', 'cache_duration': wsgi_app.CACHE_DURATION})
+
+
+def file_response(path):
+    """Serve `path`, or 404 like Flask's send_from_directory when it is missing"""
+    if not os.path.isfile(path):
+        return PlainTextResponse('Not Found', status_code=404)
+    return FileResponse(path)
+
+
+async def serve_favicon(request):
+    return file_response(os.path.join(STATIC_DIR, 'favicon.svg'))
+
+
+async def index(request):
+    return file_response(os.path.join(DIST_DIR, 'index.html'))
+
+
+routes = [
+    Route('/api/data', api_data),
+    Route('/siri', siri_summary),
+    Route('/collect-equity', collect_equity),
+    Route('/api/export', api_export),
+    Route('/api/health', health_check),
+    Route('/favicon.svg', serve_favicon),
+    Route('/', index),
+]
+# StaticFiles raises on every request if its directory is missing (e.g. frontend not built);
+# leaving the mount out lets those paths 404 instead
+for path, directory in (('/assets', os.path.join(DIST_DIR, 'assets')), ('/', DIST_DIR)):
+    if os.path.isdir(directory):
+        routes.append(Mount(path, StaticFiles(directory=directory)))
+
+app = Starlette(routes=routes)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Historical equity backfill for Bybit Cookie Counter
+Reconstructs hourly EquitySnapshot entities from Bybit's transaction log so the
+1h/24h/72h windows show a change right after a deploy instead of 'approx'.
+
+Equity at hour H is the live equity minus every balance change (realized PnL,
+funding, fees) booked after H. Unrealized PnL is assumed unchanged, so the
+snapshots are stored with source='backfill' and windows measured against them
+are labelled 'estimate'. Hours that already have a snapshot are left alone.
+Checkpoints older than the backfill window are discarded.
+
+Snapshots are written and progress is checkpointed in Datastore at the end of
+every chunk; rerunning the command after an interruption resumes where it
+stopped (use --restart to discard it).
+"""
+
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from threading import Lock
+from google.cloud import datastore
+from dotenv import load_dotenv
+from bybit_client import BybitClient, KIND_EQUITY
+from collect_equity import init_datastore
+
+# Load environment variables
+load_dotenv()
+
+KIND_BACKFILL = 'BackfillCheckpoint'
+CHECKPOINT_NAME = 'equity'
+
+BACKFILL_HOURS = 75  # matches the retention in cleanup_old_snapshots
+CHUNK_HOURS = 24  # transaction log queries may span at most 7 days; also one put_multi
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 5
+
+
+class RateLimiter:
+    """Spaces out calls across threads to at most `per_second` per second"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self.next_at = 0.0
+        self.lock = Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start_at = max(now, self.next_at)
+            self.next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+def to_ms(dt):
+    return int(dt.timestamp() * 1000)
+
+
+def fetch_chunk(client, limiter, start_ms, end_ms):
+    """Page through the transaction log for [start_ms, end_ms], returning (time_ms, change) pairs"""
+    entries = []
+    cursor = None
+    while True:
+        limiter.wait()
+        response = client.get_transaction_log(start_ms, end_ms, cursor)
+        if not response or response.get('retCode') != 0:
+            raise RuntimeError(f"transaction log request failed: {response and response.get('retMsg')}")
+
+        result = response.get('result', {})
+        for entry in result.get('list', []):
+            entries.append((int(entry['transactionTime']), float(entry.get('change') or 0)))
+
+        cursor = result.get('nextPageCursor')
+        if not cursor or not result.get('list'):
+            return entries
+
+
+def load_checkpoint(ds):
+    if not ds:
+        return None
+    return ds.get(ds.key(KIND_BACKFILL, CHECKPOINT_NAME))
+
+
+def checkpoint_entity(ds, state):
+    entity = datastore.Entity(key=ds.key(KIND_BACKFILL, CHECKPOINT_NAME))
+    entity.update(state)
+    return entity
+
+
+def backfill_equity(hours=BACKFILL_HOURS, restart=False, workers=MAX_WORKERS,
+                    requests_per_second=REQUESTS_PER_SECOND):
+    """Backfill hourly equity snapshots for the last `hours` hours"""
+    try:
+        client = BybitClient(use_datastore=True)
+        ds = init_datastore()
+
+        checkpoint = None if restart else load_checkpoint(ds)
+        if checkpoint and checkpoint['anchor_time'] < datetime.now(timezone.utc) - timedelta(hours=hours):
+            # Its hours have been purged by cleanup_old_snapshots and it never covers the hours since
+            print(f"⚠️  Discarding checkpoint from {checkpoint['anchor_time']:%Y-%m-%d %H:%M} UTC, "
+                  f"older than the {hours}h window; starting over")
+            checkpoint = None
+        if checkpoint:
+            state = dict(checkpoint)
+            print(f"⏯️  Resuming backfill at {state['next_hour']:%Y-%m-%d %H:00} UTC")
+        else:
+            balance_response = client.get_wallet_balance()
+            if not balance_response or balance_response['retCode'] != 0:
+                print("❌ Failed to get wallet balance")
+                return False
+
+            now = datetime.now(timezone.utc)
+            anchor_hour = now.replace(minute=0, second=0, microsecond=0)
+            state = {
+                'anchor_equity': float(balance_response['result']['list'][0]['totalEquity']),
+                'anchor_time': now,
+                'start_hour': anchor_hour - timedelta(hours=hours),
+                'next_hour': anchor_hour,
+                'counted_through': now,  # every change after this is in change_after
+                'change_after': 0.0,
+            }
+
+        start_hour, next_hour = state['start_hour'], state['next_hour']
+        if next_hour < start_hour:
+            print("✅ Nothing left to backfill")
+            return True
+
+        existing = {
+            snap['timestamp'].strftime('%Y-%m-%d-%H')
+            for snap in client.get_snapshot_data(hours + 1, ds)
+        } if ds else set()
+
+        # Newest-first chunks so hours can be written as soon as everything after them is known
+        chunks = []
+        chunk_end = to_ms(state['counted_through'])
+        chunk_start_hour = next_hour
+        while chunk_start_hour >= start_hour:
+            chunk_start_hour = max(start_hour, chunk_start_hour - timedelta(hours=CHUNK_HOURS - 1))
+            chunks.append((to_ms(chunk_start_hour), chunk_end))
+            chunk_end = to_ms(chunk_start_hour) - 1
+            chunk_start_hour -= timedelta(hours=1)
+
+        chunk_starts = {start_ms for start_ms, _ in chunks}
+        limiter = RateLimiter(requests_per_second)
+        written = skipped = 0
+        batch = []
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = deque(
+                (start_ms, end_ms, pool.submit(fetch_chunk, client, limiter, start_ms, end_ms))
+                for start_ms, end_ms in chunks
+            )
+            pending = deque()  # fetched changes, newest first, not yet applied
+
+            hour = next_hour
+            while hour >= start_hour:
+                hour_ms = to_ms(hour)
+                # Make sure every change after `hour` has been fetched
+                while futures and futures[0][1] > hour_ms:
+                    _, _, future = futures.popleft()
+                    pending.extend(sorted(future.result(), reverse=True))
+                while pending and pending[0][0] > hour_ms:
+                    state['change_after'] += pending.popleft()[1]
+
+                hour_key = hour.strftime('%Y-%m-%d-%H')
+                if hour_key in existing:
+                    skipped += 1
+                else:
+                    equity = state['anchor_equity'] - state['change_after']
+                    if ds:
+                        entity = datastore.Entity(key=ds.key(KIND_EQUITY, hour_key))
+                        entity.update({
+                            'timestamp': hour,
+                            'equity': equity,
+                            'hour_key': hour_key,
+                            'source': 'backfill',
+                        })
+                        batch.append(entity)
+                    else:
+                        print(f"📊 Local mode - would store: ${equity:.2f} at {hour}")
+                    written += 1
+
+                state['counted_through'] = hour
+                state['next_hour'] = hour - timedelta(hours=1)
+                hour = state['next_hour']
+
+                if ds and hour_ms in chunk_starts:
+                    ds.put_multi(batch + [checkpoint_entity(ds, state)])
+                    print(f"💾 Wrote {len(batch)} snapshots (through {hour_key})")
+                    batch = []
+
+        if ds:
+            ds.delete(ds.key(KIND_BACKFILL, CHECKPOINT_NAME))
+
+        print(f"✅ Backfill complete: {written} snapshots written, {skipped} hours already present")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error backfilling equity: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill hourly equity snapshots from the Bybit transaction log')
+    parser.add_argument('--hours', type=int, default=BACKFILL_HOURS, help='how far back to reconstruct')
+    parser.add_argument('--restart', action='store_true', help='ignore any saved checkpoint')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='concurrent transaction log fetches')
+    parser.add_argument('--rps', type=float, default=REQUESTS_PER_SECOND, help='max Bybit requests per second')
+    args = parser.parse_args()
+
+    print("🍪 Bybit Equity Backfill")
+    print("=" * 30)
+
+    if not backfill_equity(args.hours, args.restart, args.workers, args.rps):
+        print("\n❌ Backfill failed")
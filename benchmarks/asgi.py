@@ -0,0 +1,26 @@
+"""
+ASGI entrypoint used by the benchmark runner (--asgi): the async app from
+asgi.py with pybit and Datastore swapped for the local fakes.
+"""
+
+from benchmarks import fakes
+
+fakes.install()
+
+from asgi import app as asgi_app  # noqa: E402  (fakes must be installed first)
+
+
+async def app(scope, receive, send):
+    """Count requests per path and dump stats on lifespan shutdown"""
+    if scope['type'] == 'http':
+        fakes.count_request(scope['path'])
+
+    if scope['type'] == 'lifespan':
+        # uvicorn workers re-raise SIGTERM, so gunicorn's worker_exit hook never runs
+        async def send_and_dump(message):
+            if message['type'] == 'lifespan.shutdown.complete':
+                fakes.dump_stats()
+            await send(message)
+        return await asgi_app(scope, receive, send_and_dump)
+
+    await asgi_app(scope, receive, send)
@@ -0,0 +1,235 @@
+"""
+Local stand-ins for pybit's HTTP client and google.cloud.datastore.Client.
+Latency is configurable so benchmarks can model a slow Bybit or Datastore
+without touching the network.
+"""
+
+import json
+import os
+import random
+import resource
+import time
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from threading import Lock
+
+from google.cloud import datastore
+
+# Per-process upstream call counters, keyed by 'bybit.<method>' / 'datastore.<rpc>'
+upstream_calls = Counter()
+_calls_lock = Lock()
+
+# Per-process requests served, keyed by path
+requests_served = Counter()
+
+
+def count_request(path):
+    with _calls_lock:
+        requests_served[path] += 1
+
+
+def _latency(env_name, default_ms):
+    return float(os.getenv(env_name, default_ms)) / 1000
+
+
+def _record(name, delay):
+    with _calls_lock:
+        upstream_calls[name] += 1
+    if delay > 0:
+        time.sleep(delay)
+
+
+def dump_stats():
+    """Write this process's counters and peak RSS to BENCH_STATS_DIR for the runner"""
+    stats_dir = os.getenv('BENCH_STATS_DIR')
+    if not stats_dir:
+        return
+
+    stats = {
+        'pid': os.getpid(),
+        'requests': dict(requests_served),
+        'upstream_calls': dict(upstream_calls),
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    with open(os.path.join(stats_dir, f"worker-{os.getpid()}.json"), 'w') as f:
+        json.dump(stats, f)
+
+
+class FakeHTTP:
+    """Drop-in for pybit.unified_trading.HTTP with canned, slowly drifting data"""
+
+    def __init__(self, testnet=False, api_key=None, api_secret=None, **kwargs):
+        self.latency = _latency('BENCH_BYBIT_LATENCY_MS', 50)
+        self.volatility = float(os.getenv('BENCH_EQUITY_VOLATILITY', 5.0))
+        self.equity = float(os.getenv('BENCH_EQUITY', 125000.0))
+        self.lock = Lock()
+
+    def _next_equity(self):
+        with self.lock:
+            if self.volatility:
+                self.equity += random.gauss(0, self.volatility)
+            return self.equity
+
+    def get_wallet_balance(self, **kwargs):
+        _record('bybit.get_wallet_balance', self.latency)
+        equity = self._next_equity()
+        return {
+            'retCode': 0,
+            'result': {'list': [{
+                'totalEquity': f"{equity:.4f}",
+                'totalMaintenanceMargin': '1520.5',
+                'accountMMRate': '0.0121',
+                'totalAvailableBalance': f"{equity * 0.6:.4f}",
+                'totalPerpUPL': '842.17',
+            }]}
+        }
+
+    def get_positions(self, **kwargs):
+        _record('bybit.get_positions', self.latency)
+        return {
+            'retCode': 0,
+            'result': {'list': [
+                {'symbol': 'BTCUSDT', 'positionValue': '210000.5'},
+                {'symbol': 'ETHUSDT', 'positionValue': '95000.25'},
+                {'symbol': 'SOLUSDT', 'positionValue': '0'},
+            ]}
+        }
+
+    def get_closed_pnl(self, **kwargs):
+        _record('bybit.get_closed_pnl', self.latency)
+        now_ms = int(time.time() * 1000)
+        return {
+            'retCode': 0,
+            'result': {'list': [
+                {'updatedTime': str(now_ms - i * 600000), 'closedPnl': f"{(-1) ** i * 12.5 * i:.2f}"}
+                for i in range(50)
+            ]}
+        }
+
+    def get_transaction_log(self, startTime=None, endTime=None, cursor=None, limit=50, **kwargs):
+        """One fake funding/fee entry every 20 minutes, paged by an offset cursor"""
+        _record('bybit.get_transaction_log', self.latency)
+        step = 20 * 60 * 1000
+        times = list(range(endTime - endTime % step, startTime - 1, -step))
+        offset = int(cursor or 0)
+        page = times[offset:offset + limit]
+        next_cursor = str(offset + limit) if offset + limit < len(times) else ''
+        return {
+            'retCode': 0,
+            'result': {
+                'list': [{'transactionTime': str(t), 'change': f"{(t // step % 7 - 3) * 1.25:.4f}"} for t in page],
+                'nextPageCursor': next_cursor,
+            }
+        }
+
+
+class _FakeQuery:
+    def __init__(self, client, kind):
+        self.client = client
+        self.kind = kind
+        self.filters = []
+        self.order = []
+
+    def add_filter(self, property_name, operator, value):
+        self.filters.append((property_name, operator, value))
+        return self
+
+    def _matches(self, entity):
+        ops = {
+            '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+            '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+            '=': lambda a, b: a == b,
+        }
+        return all(ops[op](entity.get(prop), value) for prop, op, value in self.filters)
+
+    def fetch(self, limit=None, start_cursor=None, **kwargs):
+        _record('datastore.run_query', self.client.latency)
+        with FakeDatastoreClient._store_lock:
+            entities = [e for e in FakeDatastoreClient._store.get(self.kind, {}).values() if self._matches(e)]
+        for prop in reversed(self.order):
+            entities.sort(key=lambda e: e[prop.lstrip('-')], reverse=prop.startswith('-'))
+        return _FakeIterator(entities, limit, start_cursor)
+
+
+class _FakeIterator:
+    """Single-page query result with an offset-based cursor, like datastore.query.Iterator"""
+
+    def __init__(self, entities, limit=None, start_cursor=None):
+        offset = int(start_cursor or 0)
+        end = offset + limit if limit else len(entities)
+        self._page = entities[offset:end]
+        self.next_page_token = str(end).encode() if end < len(entities) else None
+
+    def __iter__(self):
+        return iter(self._page)
+
+    @property
+    def pages(self):
+        return iter([self._page])
+
+
+class FakeDatastoreClient:
+    """In-memory replacement for datastore.Client shared by every client in the process"""
+
+    _store = {}
+    _store_lock = Lock()
+
+    def __init__(self, *args, **kwargs):
+        self.project = 'bench'
+        self.latency = _latency('BENCH_DATASTORE_LATENCY_MS', 20)
+
+    def key(self, kind, name):
+        return datastore.Key(kind, name, project=self.project)
+
+    def query(self, kind=None):
+        return _FakeQuery(self, kind)
+
+    def get(self, key):
+        _record('datastore.lookup', self.latency)
+        with self._store_lock:
+            return self._store.get(key.kind, {}).get(key.id_or_name)
+
+    def put(self, entity):
+        self.put_multi([entity])
+
+    def put_multi(self, entities):
+        _record('datastore.commit', self.latency)
+        with self._store_lock:
+            for entity in entities:
+                self._store.setdefault(entity.key.kind, {})[entity.key.id_or_name] = entity
+
+    def delete(self, key):
+        self.delete_multi([key])
+
+    def delete_multi(self, keys):
+        _record('datastore.commit', self.latency)
+        with self._store_lock:
+            for key in keys:
+                self._store.get(key.kind, {}).pop(key.id_or_name, None)
+
+    @classmethod
+    def seed_snapshots(cls, kind, hours, equity=125000.0):
+        """Pre-populate hourly snapshots so the 1h/24h/72h windows resolve to 'true'"""
+        now = datetime.now(timezone.utc)
+        with cls._store_lock:
+            bucket = cls._store.setdefault(kind, {})
+            for h in range(1, hours + 1):
+                ts = now - timedelta(hours=h)
+                hour_key = ts.strftime('%Y-%m-%d-%H')
+                entity = datastore.Entity(key=datastore.Key(kind, hour_key, project='bench'))
+                entity.update({'timestamp': ts, 'equity': equity - h * 15.0, 'hour_key': hour_key})
+                bucket[hour_key] = entity
+
+
+def install():
+    """Patch pybit and Datastore in the already-imported modules"""
+    import bybit_client
+
+    bybit_client.HTTP = FakeHTTP
+    datastore.Client = FakeDatastoreClient
+
+    os.environ.setdefault('BYBIT_API_KEY', 'bench-key')
+    os.environ.setdefault('BYBIT_API_SECRET', 'bench-secret')
+    os.environ.setdefault('GAE_ENV', 'bench')
+
+    FakeDatastoreClient.seed_snapshots(bybit_client.KIND_EQUITY, int(os.getenv('BENCH_SNAPSHOT_HOURS', 75)))
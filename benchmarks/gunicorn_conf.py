@@ -0,0 +1,10 @@
+"""
+Gunicorn hooks for benchmark runs. Each worker dumps its counters and peak
+RSS to BENCH_STATS_DIR on exit so the runner can aggregate them.
+"""
+
+
+def worker_exit(server, worker):
+    from benchmarks import fakes
+
+    fakes.dump_stats()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Load and micro benchmarks for Bybit Cookie Counter.
+
+Runs the app under gunicorn with pybit and Datastore replaced by the local
+fakes in benchmarks/fakes.py, drives /api/data, /siri and /collect-equity
+with concurrent clients, and times get_cookie_data / update_chart_history
+in-process. Results are compared against benchmarks/baseline.json.
+
+Usage:
+    python -m benchmarks.run                      # run and compare to baseline
+    python -m benchmarks.run --save-baseline      # run and overwrite baseline
+    python -m benchmarks.run --endpoints /api/data --duration 30
+    python -m benchmarks.run --asgi --baseline benchmarks/baseline-asgi.json
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_ENDPOINTS = ['/api/data', '/siri', '/collect-equity']
+
+# Metrics where a larger number is an improvement; everything else is "lower is better"
+HIGHER_IS_BETTER = {'req_per_s'}
+# Reported but never flagged (depends on --duration)
+INFORMATIONAL = {'requests'}
+# Micro benchmarks keep the best of this many runs
+MICRO_REPEAT = 5
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def drive(port, path, concurrency, duration):
+    """Hammer `path` from `concurrency` threads for `duration` seconds"""
+    deadline = time.time() + duration
+
+    def client():
+        latencies, errors = [], 0
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=130)
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status != 200:
+                    errors += 1
+            except OSError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: client(), range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for r in results for l in r[0])
+    errors = sum(r[1] for r in results)
+    return latencies, errors, elapsed
+
+
+def run_load(path, args, env):
+    """Start a fresh gunicorn, load one endpoint, and collect per-worker stats"""
+    port = free_port()
+    stats_dir = tempfile.mkdtemp(prefix='cookie-bench-')
+    worker_env = dict(env, BENCH_STATS_DIR=stats_dir)
+
+    if args.asgi:
+        serving = ['-k', 'uvicorn.workers.UvicornWorker', 'benchmarks.asgi:app']
+    else:
+        serving = ['benchmarks.wsgi:app']
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'benchmarks/gunicorn_conf.py',
+         '-b', f"127.0.0.1:{port}", '-w', str(args.workers), '--timeout', '120',
+         '--log-level', 'warning'] + serving,
+        cwd=ROOT, env=worker_env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_until_ready(port):
+            raise RuntimeError('gunicorn did not become ready')
+        latencies, errors, elapsed = drive(port, path, args.concurrency, args.duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    requests, upstream, rss = 0, 0, []
+    for name in os.listdir(stats_dir):
+        with open(os.path.join(stats_dir, name)) as f:
+            worker = json.load(f)
+        requests += worker['requests'].get(path, 0)
+        upstream += sum(worker['upstream_calls'].values())
+        rss.append(worker['max_rss_kb'] / 1024)
+    shutil.rmtree(stats_dir, ignore_errors=True)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'req_per_s': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'upstream_calls_per_request': round(upstream / requests, 3) if requests else 0.0,
+        'max_rss_mb_per_worker': round(max(rss), 1) if rss else 0.0,
+    }
+
+
+def best_per_call(func, iterations, repeat=MICRO_REPEAT):
+    """Seconds per call, best of `repeat` runs to filter out scheduler and GC noise"""
+    return min(timeit.repeat(func, number=iterations, repeat=repeat)) / iterations
+
+
+def run_micro(iterations):
+    """Time the hot in-process functions with zero upstream latency"""
+    os.environ['BENCH_BYBIT_LATENCY_MS'] = '0'
+    os.environ['BENCH_DATASTORE_LATENCY_MS'] = '0'
+
+    from benchmarks import fakes
+    fakes.install()
+    import app
+
+    app.get_cookie_data(use_cache=False)  # warm the client
+    calls_before = sum(fakes.upstream_calls.values())
+    cookie_s = best_per_call(lambda: app.get_cookie_data(use_cache=False), iterations)
+    calls = sum(fakes.upstream_calls.values()) - calls_before
+
+    # Quiet market: equity doesn't move, so renders can be reused
+    app.get_bybit_client().client.volatility = 0
+    quiet_s = best_per_call(lambda: app.get_cookie_data(use_cache=False), iterations)
+
+    now = time.time()
+    app.chart_history = [{'timestamp': now - i * app.CHART_INTERVAL_SECONDS, 'value': 125.0}
+                         for i in reversed(range(app.MAX_CHART_POINTS))]
+
+    def chart_tick():
+        app.last_chart_update = 0
+        app.update_chart_history(125.0)
+
+    chart_s = best_per_call(chart_tick, iterations)
+
+    return {
+        'get_cookie_data_us': round(cookie_s * 1e6, 1),
+        'get_cookie_data_upstream_calls': round(calls / (iterations * MICRO_REPEAT), 3),
+        'get_cookie_data_quiet_us': round(quiet_s * 1e6, 1),
+        'update_chart_history_us': round(chart_s * 1e6, 1),
+    }
+
+
+def compare(name, current, baseline, threshold):
+    """Print current vs baseline and return the metrics that regressed"""
+    regressions = []
+    for metric, value in current.items():
+        base = baseline.get(metric)
+        if not isinstance(value, (int, float)) or not base or metric in INFORMATIONAL:
+            print(f"  {metric:32} {value}")
+            continue
+        change = (value - base) / base
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        flag = ''
+        if worse > threshold:
+            flag = '  ❌ regression'
+            regressions.append(f"{name} {metric}")
+        print(f"  {metric:32} {value:>10} (baseline {base}, {change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cookie Counter load and micro benchmarks')
+    parser.add_argument('--endpoints', nargs='+', default=DEFAULT_ENDPOINTS)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load per endpoint')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--asgi', action='store_true', help='serve asgi.py through uvicorn workers')
+    parser.add_argument('--bybit-latency', type=float, default=50, help='fake Bybit latency (ms)')
+    parser.add_argument('--datastore-latency', type=float, default=20, help='fake Datastore latency (ms)')
+    parser.add_argument('--iterations', type=int, default=2000, help='micro benchmark iterations')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    config = {
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'workers': args.workers,
+        'server': 'asgi' if args.asgi else 'wsgi',
+        'bybit_latency_ms': args.bybit_latency,
+        'datastore_latency_ms': args.datastore_latency,
+    }
+    env = dict(os.environ,
+               BENCH_BYBIT_LATENCY_MS=str(args.bybit_latency),
+               BENCH_DATASTORE_LATENCY_MS=str(args.datastore_latency))
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print(f"⚠️  Baseline was recorded with {baseline.get('config')}, numbers may not be comparable")
+
+    print("🍪 Cookie Counter benchmarks")
+    print("=" * 30)
+
+    results = {'load': {}, 'micro': {}}
+    regressions = []
+
+    if not args.skip_load:
+        for path in args.endpoints:
+            print(f"\n🚀 {path} ({args.concurrency} clients, {args.duration:.0f}s, {args.workers} {config['server']} workers)")
+            results['load'][path] = run_load(path, args, env)
+            regressions += compare(path, results['load'][path],
+                                   baseline.get('results', {}).get('load', {}).get(path, {}), args.threshold)
+
+    if not args.skip_micro:
+        print(f"\n⏱️  In-process ({args.iterations} iterations)")
+        results['micro'] = run_micro(args.iterations)
+        regressions += compare('micro', results['micro'],
+                               baseline.get('results', {}).get('micro', {}), args.threshold)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+            f.write('\n')
+        print(f"\n💾 Baseline saved to {os.path.relpath(args.baseline, ROOT)}")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+    else:
+        print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
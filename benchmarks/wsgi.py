@@ -0,0 +1,16 @@
+"""
+WSGI entrypoint used by the benchmark runner: the real Flask app with pybit
+and Datastore swapped for the local fakes.
+"""
+
+from benchmarks import fakes
+
+fakes.install()
+
+from app import app as flask_app  # noqa: E402  (fakes must be installed first)
+
+
+def app(environ, start_response):
+    """Count requests per path so upstream calls can be reported per request"""
+    fakes.count_request(environ.get('PATH_INFO', ''))
+    return flask_app(environ, start_response)
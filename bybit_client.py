@@ -4,6 +4,7 @@ from datetime import datetime, timezone, timedelta
 from pybit.unified_trading import HTTP
 from dotenv import load_dotenv
 from google.cloud import datastore
+import profiling
 
 load_dotenv()
 
@@ -37,6 +38,7 @@ class BybitClient:
             print(f"⚠️  Datastore init failed: {e}")
             return None
     
+    @profiling.traced('bybit.get_wallet_balance')
     def get_wallet_balance(self) -> Dict:
         try:
             response = self.client.get_wallet_balance(
@@ -47,6 +49,24 @@ class BybitClient:
         except:
             return None
     
+    def get_transaction_log(self, start_ms: int, end_ms: int, cursor: Optional[str] = None) -> Optional[Dict]:
+        """Fetch one page (max 50 entries) of USDT transaction log between start_ms and end_ms"""
+        try:
+            params = {
+                'accountType': "UNIFIED",
+                'currency': "USDT",
+                'startTime': start_ms,
+                'endTime': end_ms,
+                'limit': 50,
+            }
+            if cursor:
+                params['cursor'] = cursor
+            return self.client.get_transaction_log(**params)
+        except Exception as e:
+            print(f"Error fetching transaction log: {e}")
+            return None
+
+    @profiling.traced('datastore.get_snapshot_data')
     def get_snapshot_data(self, hours: int, ds=None) -> List[Dict]:
         """Get equity snapshots from the last `hours` hours."""
         ds = ds or self.datastore_client
@@ -64,7 +84,8 @@ class BybitClient:
             for entity in query.fetch():
                 data.append({
                     'timestamp': entity['timestamp'],
-                    'equity': float(entity['equity'])
+                    'equity': float(entity['equity']),
+                    'source': entity.get('source', 'collector')
                 })
 
             return data
@@ -73,6 +94,42 @@ class BybitClient:
             print(f"Error fetching {hours}h equity data: {e}")
             return []
 
+    def iter_snapshots(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       after: Optional[datetime] = None, chunk_size: int = 500, ds=None):
+        """
+        Yield equity snapshots oldest first, reading `chunk_size` entities per query
+        so arbitrarily long ranges are never held in memory at once.
+        `after` (exclusive) takes precedence over `start` (inclusive) for resuming.
+        """
+        ds = ds or self.datastore_client
+        if not ds:
+            return
+
+        query = ds.query(kind=KIND_EQUITY)
+        if after:
+            query.add_filter('timestamp', '>', after)
+        elif start:
+            query.add_filter('timestamp', '>=', start)
+        if end:
+            query.add_filter('timestamp', '<', end)
+        query.order = ['timestamp']
+
+        cursor = None
+        while True:
+            iterator = query.fetch(limit=chunk_size, start_cursor=cursor)
+            for entity in next(iterator.pages, []):
+                yield {
+                    'timestamp': entity['timestamp'],
+                    'equity': float(entity['equity']),
+                    'hour_key': entity.get('hour_key'),
+                    'source': entity.get('source', 'collector'),
+                }
+            # A short batch can still have more results behind it; only a missing token ends the query
+            cursor = iterator.next_page_token
+            if not cursor:
+                return
+
+    @profiling.profiled('get_account_info')
     def get_account_info(self, datastore_override: bool = False) -> Optional[Dict]:
         try:
             balance_response = self.get_wallet_balance()
@@ -114,7 +171,8 @@ class BybitClient:
             if datastore_override and not ds_client:
                 ds_client = self._init_datastore()
 
-            equity_data = self.get_snapshot_data(72, ds_client) if ds_client else []
+            # One extra hour so a snapshot at or before the 72h mark is included
+            equity_data = self.get_snapshot_data(73, ds_client) if ds_client else []
 
             if equity_data:
                 equity_data.sort(key=lambda x: x['timestamp'], reverse=True)
@@ -138,6 +196,8 @@ class BybitClient:
                     pnl_1h_pct = (pnl_1h / base_equity) * 100 if base_equity > 0 else 0
                     pnl_1h_hours = max(0.01, (now - snap_1h['timestamp']).total_seconds() / 3600)
                     pnl_1h_source = 'true' if (now - snap_1h['timestamp']).total_seconds() >= 3600 else 'fallback'
+                    if pnl_1h_source == 'true' and snap_1h['source'] == 'backfill':
+                        pnl_1h_source = 'estimate'
 
                 # 24 hour change
                 snap_24h = find_snapshot(24.0)
@@ -146,7 +206,7 @@ class BybitClient:
                     pnl_24h = current_equity - base_24h
                     pnl_24h_pct = (pnl_24h / base_24h) * 100 if base_24h > 0 else 0
                     pnl_24h_hours = max(0.01, (now - snap_24h['timestamp']).total_seconds() / 3600)
-                    pnl_24h_source = 'true'
+                    pnl_24h_source = 'estimate' if snap_24h['source'] == 'backfill' else 'true'
 
                 # 72 hour change
                 pnl_72h = None
@@ -160,14 +220,15 @@ class BybitClient:
                     pnl_72h = current_equity - base_72h
                     pnl_72h_pct = (pnl_72h / base_72h) * 100 if base_72h > 0 else 0
                     pnl_72h_hours = max(0.01, (now - snap_72h['timestamp']).total_seconds() / 3600)
-                    pnl_72h_source = 'true'
+                    pnl_72h_source = 'estimate' if snap_72h['source'] == 'backfill' else 'true'
 
             # Calculate effective leverage from open positions
             try:
-                linear_response = self.client.get_positions(
-                    category="linear",
-                    settleCoin="USDT"
-                )
+                with profiling.span('bybit.get_positions'):
+                    linear_response = self.client.get_positions(
+                        category="linear",
+                        settleCoin="USDT"
+                    )
                 if linear_response and linear_response.get('retCode') == 0:
                     positions = linear_response.get('result', {}).get('list', [])
                     for pos in positions:
@@ -234,6 +295,7 @@ class BybitClient:
             return None
     
     
+    @profiling.traced('get_current_unrealized_pnl')
     def get_current_unrealized_pnl(self) -> Optional[float]:
         """Get current unrealized PnL from wallet balance"""
         try:
@@ -248,6 +310,7 @@ class BybitClient:
             print(f"Error getting unrealized PnL: {e}")
             return None
     
+    @profiling.traced('bybit.get_pnl_data')
     def get_pnl_data(self) -> Optional[Dict]:
         try:
             response = self.client.get_closed_pnl(
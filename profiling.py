@@ -0,0 +1,225 @@
+"""
+Opt-in profiling for the refresh path (get_cookie_data / get_account_info).
+
+Disabled unless PROFILE_SAMPLE_RATE > 0 or PROFILE_TOKEN is set at startup;
+when disabled the decorators return the original functions untouched.
+
+    PROFILE_SAMPLE_RATE  fraction of refreshes to profile (e.g. 0.01)
+    PROFILE_TOKEN        profile any request sent with `X-Profile: <token>`
+                         (Flask reads the header itself; other servers call
+                         requested() and run the refresh inside forced())
+    PROFILE_DIR          where dumps are written (default /tmp/cookie-profiles)
+    PROFILE_MAX_FILES    number of profiles kept before the oldest are removed
+
+Sampled requests answered from the response cache are discarded (see
+use_cached()), so only real refreshes are written; a request carrying the
+token bypasses the cache instead.
+
+Each sampled refresh writes three files sharing a prefix:
+    .pstats      cProfile stats (python -m pstats, snakeviz)
+    .folded      collapsed span stacks (flamegraph.pl, speedscope)
+    .spans.json  span timeline with start/duration in ms
+"""
+
+import cProfile
+import glob
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/cookie-profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))
+PROFILE_HEADER = 'X-Profile'
+
+ENABLED = PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_TOKEN)
+
+_state = threading.local()
+# Only one cProfile profiler may run at a time; concurrent samples keep spans only
+_profiler_lock = threading.Lock()
+_rotate_lock = threading.Lock()
+_NULL_SPAN = nullcontext()
+# Set by forced(); copied into worker threads by asyncio.to_thread
+_forced = ContextVar('profile_forced', default=False)
+
+
+def requested(headers):
+    """True when `headers` carry the profiling token"""
+    return bool(PROFILE_TOKEN) and headers.get(PROFILE_HEADER) == PROFILE_TOKEN
+
+
+@contextmanager
+def forced():
+    """Profile the next refresh entered in this context regardless of sampling"""
+    token = _forced.set(True)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+def _requested_by_header():
+    if not PROFILE_TOKEN:
+        return False
+    if _forced.get():
+        return True
+    from flask import has_request_context, request
+    return has_request_context() and requested(request.headers)
+
+
+def _should_sample():
+    """Returns (sample, forced)"""
+    if _requested_by_header():
+        return True, True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE, False
+
+
+def use_cached():
+    """
+    Called before serving a cached response. A token-forced profile returns
+    False so the caller refreshes; a sampled one is discarded since there is
+    no refresh to profile.
+    """
+    if getattr(_state, 'spans', None) is None:
+        return True
+    if _state.forced:
+        return False
+    _state.discard = True
+    return True
+
+
+@contextmanager
+def _record_span(name):
+    spans = _state.spans
+    parent = _state.stack[-1] if _state.stack else None
+    entry = {'name': name, 'parent': parent, 'start': time.perf_counter(), 'duration': 0.0}
+    spans.append(entry)
+    _state.stack.append(len(spans) - 1)
+    try:
+        yield
+    finally:
+        entry['duration'] = time.perf_counter() - entry['start']
+        _state.stack.pop()
+
+
+def span(name):
+    """Context manager timing a block when the current refresh is being profiled"""
+    if getattr(_state, 'spans', None) is None:
+        return _NULL_SPAN
+    return _record_span(name)
+
+
+def traced(name):
+    """Decorator recording a span for `func` inside profiled refreshes"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profiled(name):
+    """
+    Decorator marking a refresh entry point. A sampled call runs under cProfile
+    and records a span timeline; nested profiled calls act as plain spans.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_state, 'spans', None) is not None:
+                with _record_span(name):
+                    return func(*args, **kwargs)
+            sample, forced = _should_sample()
+            if not sample:
+                return func(*args, **kwargs)
+
+            _state.spans, _state.stack = [], []
+            _state.forced, _state.discard = forced, False
+            profiler = cProfile.Profile() if _profiler_lock.acquire(blocking=False) else None
+            started = time.time()
+            try:
+                with _record_span(name):
+                    if profiler:
+                        return profiler.runcall(func, *args, **kwargs)
+                    return func(*args, **kwargs)
+            finally:
+                if profiler:
+                    _profiler_lock.release()
+                spans, discard = _state.spans, _state.discard
+                _state.spans = _state.stack = None
+                if not discard:
+                    _write_profile(name, started, spans, profiler)
+        return wrapper
+    return decorator
+
+
+def _span_path(spans, index):
+    names = []
+    while index is not None:
+        names.append(spans[index]['name'])
+        index = spans[index]['parent']
+    return ';'.join(reversed(names))
+
+
+def _write_profile(name, started, spans, profiler):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(started))
+        prefix = os.path.join(PROFILE_DIR, f"{stamp}-{int(started * 1000) % 1000:03d}-{os.getpid()}-{name}")
+
+        origin = spans[0]['start']
+        timeline = [{
+            'name': s['name'],
+            'path': _span_path(spans, i),
+            'start_ms': round((s['start'] - origin) * 1000, 3),
+            'duration_ms': round(s['duration'] * 1000, 3),
+        } for i, s in enumerate(spans)]
+        with open(f"{prefix}.spans.json", 'w') as f:
+            json.dump({'name': name, 'started': started, 'spans': timeline}, f, indent=2)
+
+        # Collapsed stacks weighted by self time in microseconds
+        self_time = [s['duration'] for s in spans]
+        for s in spans:
+            if s['parent'] is not None:
+                self_time[s['parent']] -= s['duration']
+        with open(f"{prefix}.folded", 'w') as f:
+            for i in range(len(spans)):
+                f.write(f"{_span_path(spans, i)} {max(0, int(self_time[i] * 1e6))}\n")
+
+        if profiler:
+            profiler.dump_stats(f"{prefix}.pstats")
+
+        _rotate()
+    except Exception as e:
+        print(f"⚠️  Error writing profile: {e}")
+
+
+def _rotate():
+    """Keep only the newest PROFILE_MAX_FILES profiles"""
+    with _rotate_lock:
+        timelines = sorted(glob.glob(os.path.join(PROFILE_DIR, '*.spans.json')))
+        excess = len(timelines) - max(PROFILE_MAX_FILES, 1)
+        for stale in timelines[:max(0, excess)]:
+            prefix = stale[:-len('.spans.json')]
+            for suffix in ('.spans.json', '.folded', '.pstats'):
+                try:
+                    os.remove(prefix + suffix)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,12 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Run against the in-memory Bybit/Datastore fakes with no simulated latency
+os.environ.setdefault('BENCH_BYBIT_LATENCY_MS', '0')
+os.environ.setdefault('BENCH_DATASTORE_LATENCY_MS', '0')
+
+from benchmarks import fakes  # noqa: E402
+
+fakes.install()
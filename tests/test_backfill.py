@@ -0,0 +1,56 @@
+from collections import Counter
+
+import pytest
+
+import backfill_equity
+from bybit_client import KIND_EQUITY
+from benchmarks import fakes
+
+STEP_MS = 20 * 60 * 1000  # fakes.FakeHTTP books one change every 20 minutes
+
+
+def fake_change(t):
+    return (t // STEP_MS % 7 - 3) * 1.25
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # Start from an empty Datastore so every hour gets backfilled
+    monkeypatch.setattr(fakes.FakeDatastoreClient, '_store', {})
+    return fakes.FakeDatastoreClient._store
+
+
+def test_resume_after_interrupted_put(store, monkeypatch):
+    original = fakes.FakeDatastoreClient.put_multi
+    puts, checkpoints = Counter(), []
+    interrupt = True  # fail the second put_multi, after the first chunk is stored
+
+    def put_multi(self, entities):
+        if interrupt and len(checkpoints) == 1:
+            raise RuntimeError('deadline exceeded')
+        for entity in entities:
+            if entity.key.kind == KIND_EQUITY:
+                puts[entity.key.name] += 1
+            else:
+                checkpoints.append(dict(entity))
+        original(self, entities)
+
+    monkeypatch.setattr(fakes.FakeDatastoreClient, 'put_multi', put_multi)
+
+    assert not backfill_equity.backfill_equity(hours=75, requests_per_second=1000)
+    assert sum(puts.values()) == backfill_equity.CHUNK_HOURS
+
+    interrupt = False
+    assert backfill_equity.backfill_equity(hours=75, requests_per_second=1000)
+
+    assert len(puts) == 76
+    assert set(puts.values()) == {1}
+    assert 'equity' not in store.get(backfill_equity.KIND_BACKFILL, {})
+
+    anchor_ms = backfill_equity.to_ms(checkpoints[0]['anchor_time'])
+    anchor_equity = checkpoints[0]['anchor_equity']
+    for snapshot in store[KIND_EQUITY].values():
+        hour_ms = backfill_equity.to_ms(snapshot['timestamp'])
+        later = sum(fake_change(t) for t in range(anchor_ms - anchor_ms % STEP_MS, hour_ms, -STEP_MS))
+        assert snapshot['equity'] == pytest.approx(anchor_equity - later)
+        assert snapshot['source'] == 'backfill'
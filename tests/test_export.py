@@ -0,0 +1,74 @@
+import json
+import time
+
+import pytest
+
+import app
+from benchmarks import fakes
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def export(client, **params):
+    response = client.get('/api/export', query_string=params)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_chart_resume_has_no_duplicates(client, monkeypatch):
+    # Sub-microsecond parts, so some timestamps round down when exported
+    now = time.time()
+    points = [{'timestamp': now - i * 10 + i * 1.37e-7, 'value': i} for i in reversed(range(60))]
+    monkeypatch.setattr(app, 'chart_history', points)
+
+    rows = export(client, source='chart')
+    assert len(rows) == 60
+
+    for i, row in enumerate(rows):
+        resumed = export(client, source='chart', cursor=row['timestamp'])
+        assert resumed == rows[i + 1:]
+
+
+def test_chart_resume_across_chunks(client, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(app, 'chart_history',
+                        [{'timestamp': now - i + 3.3e-7, 'value': i} for i in reversed(range(25))])
+    monkeypatch.setattr(app, 'EXPORT_CHUNK_SIZE', 4)
+
+    rows = export(client, source='chart')
+    assert [r['value'] for r in rows] == list(reversed(range(25)))
+
+
+def test_snapshot_resume_has_no_duplicates(client):
+    rows = export(client, source='snapshots')
+    assert len(rows) > 10
+
+    resumed = export(client, source='snapshots', cursor=rows[9]['timestamp'])
+    assert resumed == rows[10:]
+
+
+def test_snapshot_export_continues_after_short_batch(client, monkeypatch):
+    # Datastore may return fewer entities than the limit with more results pending
+    original = fakes._FakeIterator.__init__
+
+    def short_batches(self, entities, limit=None, start_cursor=None):
+        original(self, entities, limit, start_cursor)
+        offset = int(start_cursor or 0)
+        self._page = self._page[:2]
+        if offset + 2 < len(entities):
+            self.next_page_token = str(offset + 2).encode()
+
+    expected = len(fakes.FakeDatastoreClient._store['EquitySnapshot'])
+    monkeypatch.setattr(fakes._FakeIterator, '__init__', short_batches)
+
+    assert len(export(client, source='snapshots')) == expected
+
+
+@pytest.mark.parametrize('start', ['1e20', 'inf', '-inf', 'nan', 'yesterday'])
+def test_invalid_times_are_rejected(client, start):
+    response = client.get('/api/export', query_string={'start': start})
+    assert response.status_code == 400
+    assert response.json['status'] == 'error'
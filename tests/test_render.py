@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def bybit(monkeypatch):
+    """A quiet market with no chart point due"""
+    client = app.get_bybit_client()
+    monkeypatch.setattr(client.client, 'volatility', 0)
+    monkeypatch.setattr(app, 'chart_history', [{'timestamp': time.time(), 'value': 125.0}])
+    monkeypatch.setattr(app, 'last_chart_update', time.time())
+    monkeypatch.setitem(app.render_cache, 'key', None)
+    return client
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """account_info of every render_cookie_data call"""
+    calls = []
+    original = app.render_cookie_data
+
+    def counting_render(account_info, unrealized_pnl):
+        calls.append(account_info)
+        return original(account_info, unrealized_pnl)
+
+    monkeypatch.setattr(app, 'render_cookie_data', counting_render)
+    return calls
+
+
+def refresh():
+    return app.get_cookie_data(use_cache=False)
+
+
+def test_quiet_market_renders_once(bybit, renders):
+    first = refresh()
+    second = refresh()
+
+    assert len(renders) == 1
+    assert second is first
+
+    fresh = app.app.json.dumps(app.render_cookie_data(renders[0], bybit.get_current_unrealized_pnl() or 0))
+    assert app.rendered_body(second) == fresh.encode('utf-8')
+
+
+def test_equity_change_rerenders(bybit, renders, monkeypatch):
+    first = refresh()
+    monkeypatch.setattr(bybit.client, 'equity', bybit.client.equity + 1)
+    second = refresh()
+
+    assert len(renders) == 2
+    assert second['equity'] == pytest.approx(first['equity'] + 1)
+
+
+def test_new_chart_point_rerenders(bybit, renders, monkeypatch):
+    first = refresh()
+    monkeypatch.setattr(app, 'last_chart_update', 0)
+    second = refresh()
+
+    assert len(renders) == 2
+    assert len(second['chart_data']) == len(first['chart_data']) + 1
+
+
+def test_source_change_rerenders(bybit, renders, monkeypatch):
+    first = refresh()
+    original = bybit.get_account_info
+    monkeypatch.setattr(bybit, 'get_account_info', lambda: dict(original(), pnl_1h_source='estimate'))
+    second = refresh()
+
+    assert len(renders) == 2
+    assert 'estimated' in second['pnl_lines'][0]['text']
+    assert 'estimated' not in first['pnl_lines'][0]['text']